@@ -2,8 +2,67 @@
 import threading
 import time
 import csv
+import queue
+from collections import deque, namedtuple
 import numpy as np
 import PySpin
+from typing import Optional
+
+from backend.thread_priority import THREAD_PRIORITY_HIGHEST, raise_thread_priority
+
+# Initial number of rows preallocated in the binary metadata log
+METADATA_INITIAL_CAPACITY = 4096
+
+# One row of the binary metadata log (<recording>_metadata.bin).
+# Missing camera_frame_id / timestamp_us are -1; sys_ns is wall-clock
+# time in ns since the epoch; label_id indexes <recording>_labels.txt
+# (-1 = no label).
+METADATA_DTYPE = np.dtype([
+    ("idx", "<i8"),
+    ("cam_id", "<i8"),
+    ("ts_us", "<i8"),
+    ("sys_ns", "<i8"),
+    ("sync", "u1"),
+    ("label_id", "<i4"),
+])
+
+# Metadata for one recorded frame, built by the acquisition thread and
+# handed to the recorder with the image. Fields already use the binary
+# log's conventions (-1 for missing IDs, wall-clock ns), so the recorder
+# only adds the record index and the label ID.
+MDRec = namedtuple("MDRec", "cam_id ts_us sys_ns sync label")
+
+# Header of <recording>_metadata.csv
+METADATA_CSV_HEADER = (
+    "record_frame_index",
+    "camera_frame_id",
+    "timestamp_us",
+    "system_time",
+    "sync_pulse",
+    "sync_label",
+)
+
+# Flush the metadata CSV every N rows, so a crash loses at most N rows
+METADATA_CSV_FLUSH_EVERY = 256
+
+# Messages kept for the GUI to drain (oldest dropped first)
+LOG_RING_SIZE = 256
+
+# Max frames waiting for the recorder thread before new ones are dropped
+RECORD_QUEUE_SIZE = 32
+
+# Driver buffers: queued frames hold theirs until the recorder releases
+# them, so leave room for a full queue plus frames being processed
+STREAM_BUFFER_COUNT = RECORD_QUEUE_SIZE + 4
+
+# GetNextImage() timeout, so the acquisition loop can notice stop requests
+GRAB_TIMEOUT_MS = 100
+
+# How long to wait for room in the record queue for the end-of-recording
+# sentinel before discarding the queued frames (see _finish_record_queue)
+RECORD_SENTINEL_TIMEOUT_S = 1.0
+SPINNAKER_ERR_TIMEOUT = -1011
+
 
 def detect_first_camera():
     """
@@ -64,8 +123,10 @@ class CameraController:
       - Recording to AVI via SpinVideo (MJPEG)
       - Logging per-recorded-frame metadata to CSV
 
-    All SpinVideo operations (Open, Append, Close) happen ONLY
-    inside the acquisition thread to avoid crashes.
+    Recorded frames are handed from the acquisition thread to a
+    recorder thread over a bounded queue, so slow disk writes do not
+    stall GetNextImage(). All SpinVideo operations (Open, Append, Close)
+    happen ONLY inside the recorder thread to avoid crashes.
     """
 
     def __init__(self):
@@ -79,9 +140,23 @@ class CameraController:
         self._acq_thread = None
         self._stop_event = threading.Event()
 
-        # Latest frame for preview
-        self._latest_frame = None
-        self._frame_lock = threading.Lock()
+        # Messages from the camera/recorder threads; appending to a deque
+        # is cheap and never blocks on stdout (see drain_log)
+        self._log_ring = deque(maxlen=LOG_RING_SIZE)
+
+        # Latest frame for preview (double-buffered: acquisition writes
+        # into the idle slot, then publishes its index with a single
+        # attribute store; the GUI reads the published slot, no lock)
+        self._preview_buffers = [None, None]
+        self._preview_write_idx = 0
+        self._preview_ready_idx = -1
+
+        # Skip the preview copy while the GUI has not read the last
+        # published frame yet (it only ever wants the newest one)
+        self.skip_unread_preview = True
+        self._preview_consumed = True
+        # Set on every publish, so a reader can block instead of polling
+        self._frame_event = threading.Event()
 
         # Recording state/flags (thread-safe)
         self.recording_active = False          # true while SpinVideo is open
@@ -91,13 +166,37 @@ class CameraController:
         self.avi_recorder = None
         self.recording_fps = 30.0
         self.record_filename = None
-        self.metadata_records = []
+        self.metadata_capacity = METADATA_INITIAL_CAPACITY
         self.frame_counter = 0
 
+        # Recorder thread + its input queue (one per recording).
+        # _record_q is dropped once the end sentinel is sent; _recorder_q
+        # stays set until the recorder thread has been joined.
+        self._record_q = None
+        self._recorder_q = None
+        self._record_thread = None
+        self.dropped_frames = 0  # frames skipped because the queue was full
+
+        # Per-recorded-frame metadata: a memory-mapped binary log plus
+        # (optionally) a CSV, both appended by the recorder thread
+        self.write_metadata_csv = True
+        self._md = None
+        self._md_path = None
+        self._md_n = 0
+        self._md_label_ids = {}
+        self._md_labels_path = None
+
+        # Per-frame times are perf_counter_ns() readings; these two
+        # references convert them to wall-clock time for the metadata.
+        # Re-taken when each recording starts (see _acquisition_loop).
+        self._t0_wall_ns = time.time_ns()
+        self._t0_mono = time.perf_counter_ns()
+
         # --- Sync marker state (for CSV logging) ---
-        self._sync_lock = threading.Lock()
-        self._sync_window_end = 0.0  # wall-clock time until which sync_pulse=True
-        self._sync_label = None  # label for the current sync window
+        # No lock: each field is a single GIL-atomic attribute; the end
+        # is published after the label (see notify_sync_pulse_window)
+        self._sync_window_end_ns: int = 0  # perf_counter_ns until which sync_pulse=True
+        self._sync_label: Optional[str] = None  # label for the current sync window
 
     # ------------------------------------------------------------------
     # Camera start/stop
@@ -139,6 +238,22 @@ class CameraController:
             if PySpin.IsWritable(frame_rate):
                 frame_rate.SetValue(30.0)  # target 30 fps
 
+            # Buffer handling stays at the driver default (oldest first):
+            # NewestOnly would silently discard queued frames, and with
+            # them frames of the recording, whenever the loop falls behind.
+            stream_nodemap = self.cam.GetTLStreamNodeMap()
+
+            # Enough buffers that frames in flight to the recorder don't
+            # starve the stream while the next frame is being acquired
+            count_mode = PySpin.CEnumerationPtr(stream_nodemap.GetNode("StreamBufferCountMode"))
+            if PySpin.IsReadable(count_mode) and PySpin.IsWritable(count_mode):
+                manual = count_mode.GetEntryByName("Manual")
+                if PySpin.IsReadable(manual):
+                    count_mode.SetIntValue(manual.GetValue())
+            buffer_count = PySpin.CIntegerPtr(stream_nodemap.GetNode("StreamBufferCountManual"))
+            if PySpin.IsReadable(buffer_count) and PySpin.IsWritable(buffer_count):
+                buffer_count.SetValue(min(STREAM_BUFFER_COUNT, buffer_count.GetMax()))
+
             self.cam.BeginAcquisition()
             self.acquiring = True
             self._stop_event.clear()
@@ -160,6 +275,7 @@ class CameraController:
         Clean shutdown:
           - Request recording stop (if active) and wait briefly
           - Stop acquisition thread
+          - Discard the recorder's backlog and wait for it to close its files
           - DeInit camera, clear camera list, release system
         """
         # If recording is active or queued, request stop and give loop time
@@ -171,23 +287,40 @@ class CameraController:
                     break
                 time.sleep(0.01)
 
-        # Tell acquisition loop to stop
+        # Tell acquisition loop to stop; GetNextImage() times out after
+        # GRAB_TIMEOUT_MS, so it exits without ending acquisition first
         self._stop_event.set()
+        if self._acq_thread is not None:
+            try:
+                self._acq_thread.join(timeout=2.0)
+            except Exception:
+                pass
+            self._acq_thread = None
 
-        # Break GetNextImage()
-        if self.cam is not None and self.acquiring:
+        # Shutting down: drop (and release) the frames still queued for the
+        # recorder, so it only finishes the frame in hand and closes its
+        # files. Its images must be released before the camera goes away.
+        if self._record_thread is not None:
+            discarded = self._discard_record_backlog(self._recorder_q)
+            if discarded:
+                self._log(f"Stopping: discarded {discarded} frames not yet recorded")
             try:
-                self.cam.EndAcquisition()
+                self._record_thread.join()
             except Exception:
                 pass
+            self._record_thread = None
+        self._record_q = None
+        self._recorder_q = None
+        self.recording_active = False
+        self.record_start_requested = False
+        self.record_stop_requested = False
 
-        # Wait for thread to exit
-        if self._acq_thread is not None:
+        # End acquisition
+        if self.cam is not None and self.acquiring:
             try:
-                self._acq_thread.join(timeout=2.0)
+                self.cam.EndAcquisition()
             except Exception:
                 pass
-            self._acq_thread = None
 
         # DeInit camera
         if self.cam is not None:
@@ -209,7 +342,11 @@ class CameraController:
         self._cleanup_system()
 
         self.acquiring = False
-        self._latest_frame = None
+        self._preview_ready_idx = -1
+        self._preview_write_idx = 0
+        self._preview_buffers = [None, None]
+        self._preview_consumed = True
+        self._frame_event.clear()
 
     def _cleanup_system(self):
         if self.system is not None:
@@ -229,42 +366,57 @@ class CameraController:
         # 1) Turn on chunk mode
         chunk_mode_active = PySpin.CBooleanPtr(nodemap.GetNode("ChunkModeActive"))
         if not PySpin.IsWritable(chunk_mode_active):
-            print("ChunkModeActive not writable; skipping chunk setup.")
+            self._log("ChunkModeActive not writable; skipping chunk setup.")
             return
 
         chunk_mode_active.SetValue(True)
-        print("Chunk mode activated.")
+        self._log("Chunk mode activated.")
 
         # 2) Enable specific chunks if they exist
         chunk_selector = PySpin.CEnumerationPtr(nodemap.GetNode("ChunkSelector"))
         chunk_enable = PySpin.CBooleanPtr(nodemap.GetNode("ChunkEnable"))
 
         if not (PySpin.IsReadable(chunk_selector) and PySpin.IsWritable(chunk_selector)):
-            print("ChunkSelector not usable; skipping chunk setup.")
+            self._log("ChunkSelector not usable; skipping chunk setup.")
             return
 
-        for name in ["Timestamp", "FrameID"]:
+        # Resolve each chunk's selector value once (string lookups walk the
+        # node tree), then select and enable by integer value
+        entry_values = {}
+        for name in ("Timestamp", "FrameID"):
             try:
                 entry = chunk_selector.GetEntryByName(name)
-                if not PySpin.IsReadable(entry):
-                    continue
+                if entry is not None and PySpin.IsReadable(entry):
+                    entry_values[name] = entry.GetValue()
+            except Exception as exc:
+                # This chunk name might simply not exist on this model
+                self._log(f"Could not enable chunk '{name}': {exc}")
 
-                chunk_selector.SetIntValue(entry.GetValue())
-                if PySpin.IsWritable(chunk_enable):
+        for name, value in entry_values.items():
+            try:
+                chunk_selector.SetIntValue(value)
+                # Skip redundant writes for chunks that are already on
+                if PySpin.IsWritable(chunk_enable) and not chunk_enable.GetValue():
                     chunk_enable.SetValue(True)
             except Exception as exc:
-                # This chunk name might simply not exist on this model
-                print(f"Could not enable chunk '{name}': {exc}")
-                continue
+                self._log(f"Could not enable chunk '{name}': {exc}")
 
     # ------------------------------------------------------------------
     # Recording control (GUI thread): only set flags
     # ------------------------------------------------------------------
 
-    def start_recording(self, filename: str, fps: float = 30.0):
+    def start_recording(
+        self,
+        filename: str,
+        fps: float = 30.0,
+        expected_duration_s: Optional[float] = None,
+    ):
         """
-        Request recording to start. The acquisition thread will
-        actually open SpinVideo and begin appending frames.
+        Request recording to start. The acquisition thread will start
+        a recorder thread, which opens SpinVideo and appends frames.
+
+        If `expected_duration_s` is given, metadata storage is sized up
+        front for that long (plus 20%) so it does not need to grow.
 
         Returns:
             (ok: bool, message: str)
@@ -277,112 +429,317 @@ class CameraController:
 
         self.record_filename = filename
         self.recording_fps = fps
-        self.metadata_records = []
+        self.metadata_capacity = METADATA_INITIAL_CAPACITY
+        if expected_duration_s is not None:
+            self.metadata_capacity = max(
+                METADATA_INITIAL_CAPACITY,
+                int(fps * float(expected_duration_s) * 1.2),
+            )
+        self.dropped_frames = 0
         self.record_start_requested = True
         self.record_stop_requested = False
-        # Reset recording frame counter
-        self.frame_counter = 0
 
         return True, f"Recording requested: {filename}"
 
+    @property
+    def recording_started(self) -> bool:
+        """
+        True once the recorder for the last start_recording() is running,
+        i.e. frames from now on go into that recording. Starting can lag
+        the request while the previous recorder finishes its backlog.
+        """
+        return self.recording_active and not self.record_start_requested
+
     def stop_recording(self):
         """
-        Request recording to stop. The acquisition thread will
+        Request recording to stop. The recorder thread will
         close SpinVideo and write CSV.
         """
         if not self.recording_active and not self.record_start_requested:
             return
         self.record_stop_requested = True
 
+    # ------------------------------------------------------------------
+    # Metadata storage (memory-mapped binary log, grown geometrically)
+    # ------------------------------------------------------------------
+
+    def _open_metadata(self, base_path: str, capacity: int = METADATA_INITIAL_CAPACITY):
+        self._md_path = base_path + "_metadata.bin"
+        self._md_labels_path = base_path + "_labels.txt"
+        self._md = np.memmap(self._md_path, dtype=METADATA_DTYPE, mode="w+", shape=(capacity,))
+        # Start the labels file empty too, like the .bin; an old one with
+        # the same name would otherwise get conflicting label IDs appended
+        open(self._md_labels_path, "w").close()
+        self._md_n = 0
+        self._md_label_ids = {}
+
+    def _append_metadata(self, frame_idx, rec):
+        """
+        Store one row. Disk errors are logged, not raised: if the log
+        can't grow, it keeps the rows written so far and stops there.
+        """
+        if self._md is None:
+            return  # stopped after an earlier error
+        n = self._md_n
+        if n >= len(self._md):
+            try:
+                self._remap_metadata(2 * len(self._md))
+            except Exception as exc:
+                self._log(f"Error growing metadata log, keeping first {n} rows: {exc}")
+                self._md = None
+                return
+
+        label = rec.label
+        label_id = -1
+        if label is not None:
+            label_id = self._md_label_ids.get(label, -1)
+            if label_id < 0:
+                label_id = len(self._md_label_ids)
+                self._md_label_ids[label] = label_id
+                try:
+                    with open(self._md_labels_path, "a") as f:
+                        f.write(f"{label_id}\t{label}\n")
+                except OSError as exc:
+                    self._log(f"Error writing metadata label {label!r}: {exc}")
+
+        # One row store; the OS writes dirty pages back lazily
+        self._md[n] = (frame_idx, rec.cam_id, rec.ts_us, rec.sys_ns, rec.sync, label_id)
+        self._md_n = n + 1
+
+    def _remap_metadata(self, rows: int):
+        """Flush the log, resize the file to `rows` rows and map it again."""
+        self._md.flush()
+        self._md = None  # drop the mapping before resizing (needed on Windows)
+        with open(self._md_path, "r+b") as f:
+            f.truncate(rows * METADATA_DTYPE.itemsize)
+        if rows > 0:
+            self._md = np.memmap(self._md_path, dtype=METADATA_DTYPE, mode="r+", shape=(rows,))
+
+    def _close_metadata(self):
+        """Flush the log and trim the file to the rows actually written."""
+        try:
+            if self._md is not None:
+                self._remap_metadata(self._md_n)
+        finally:
+            self._md = None
+            self._md_path = None
+            self._md_n = 0
+            self._md_label_ids = {}
+
+    # ------------------------------------------------------------------
+    # Recorder thread (one per recording)
+    # ------------------------------------------------------------------
+
+    def _record_worker(self, record_q, filename, fps, metadata_capacity):
+        """
+        Open SpinVideo, append every frame received on `record_q` and
+        log its metadata (binary log + CSV rows as they arrive), until
+        the None sentinel arrives. Then close SpinVideo and the logs.
+
+        Each queued image is released here, after it has been appended.
+        """
+        base_path = filename.rsplit(".", 1)[0]
+        self.frame_counter = 0
+        csv_file = None
+        csv_writer = None
+
+        try:
+            self._open_metadata(base_path, metadata_capacity)
+            if self.write_metadata_csv:
+                # Simple csv module, no pandas; 1 MiB buffer so rows reach
+                # the OS in large chunks
+                csv_file = open(base_path + "_metadata.csv", "w", newline="", buffering=1 << 20)
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(METADATA_CSV_HEADER)
+            self.avi_recorder = PySpin.SpinVideo()
+            opt = PySpin.MJPGOption()
+            opt.frameRate = fps
+            opt.quality = 75
+            self.avi_recorder.Open(filename, opt)
+        except Exception as exc:
+            self._log(f"Error starting recording: {exc}")
+            self.avi_recorder = None
+            # Nothing to record into: end this recording
+            self.record_stop_requested = True
+
+        md_errors = 0
+        try:
+            while True:
+                item = record_q.get()
+                if item is None:
+                    break
+
+                image, rec = item
+                try:
+                    if self.avi_recorder is None:
+                        continue
+                    # Increment only for recorded frames
+                    self.frame_counter += 1
+                    try:
+                        self.avi_recorder.Append(image)
+                    except Exception as exc:
+                        self._log(f"Error appending frame: {exc}")
+
+                    try:
+                        self._append_metadata(self.frame_counter, rec)
+                    except Exception as exc:
+                        md_errors += 1
+                        if md_errors == 1:
+                            self._log(f"Error writing metadata log: {exc}")
+                    if csv_writer is not None:
+                        try:
+                            csv_writer.writerow((
+                                self.frame_counter,
+                                "" if rec.cam_id < 0 else rec.cam_id,
+                                "" if rec.ts_us < 0 else rec.ts_us,
+                                rec.sys_ns / 1e9,
+                                rec.sync,
+                                "" if rec.label is None else rec.label,
+                            ))
+                            if self.frame_counter % METADATA_CSV_FLUSH_EVERY == 0:
+                                csv_file.flush()
+                        except Exception as exc:
+                            self._log(f"Error writing metadata CSV: {exc}")
+                finally:
+                    image.Release()
+        finally:
+            if md_errors > 1:
+                self._log(f"Metadata log failed for {md_errors} frames")
+
+            try:
+                if self.avi_recorder is not None:
+                    self.avi_recorder.Close()
+            except Exception as exc:
+                self._log(f"Error closing recorder: {exc}")
+            self.avi_recorder = None
+
+            if csv_file is not None:
+                try:
+                    csv_file.close()
+                except Exception as exc:
+                    self._log(f"Error writing metadata CSV: {exc}")
+
+            if self._md_path is not None:
+                try:
+                    self._close_metadata()
+                except Exception as exc:
+                    self._log(f"Error closing metadata log: {exc}")
+
+    def _finish_record_queue(self, record_q):
+        """
+        Send the end-of-recording sentinel to the recorder thread without
+        blocking forever: if the queue stays full (the recorder is stuck
+        or gone), discard and release what is queued, then send it.
+        """
+        try:
+            record_q.put(None, timeout=RECORD_SENTINEL_TIMEOUT_S)
+        except queue.Full:
+            discarded = self._discard_record_backlog(record_q)
+            self._log(f"Recorder not keeping up; discarded {discarded} queued frames")
+
+        if self.dropped_frames:
+            self._log(
+                f"Recording dropped {self.dropped_frames} frames (recorder queue full)"
+            )
+
+    def _discard_record_backlog(self, record_q) -> int:
+        """
+        Release every frame waiting in `record_q`, then queue the sentinel
+        so the recorder exits after the frame it is on. Returns the number
+        of frames discarded.
+        """
+        discarded = 0
+        while True:
+            try:
+                item = record_q.get_nowait()
+            except queue.Empty:
+                try:
+                    record_q.put_nowait(None)
+                    return discarded
+                except queue.Full:
+                    continue  # refilled meanwhile; drain again
+            if item is not None:
+                item[0].Release()
+                discarded += 1
+
     # ------------------------------------------------------------------
     # Acquisition loop (runs in background thread)
     # ------------------------------------------------------------------
 
     def _acquisition_loop(self):
-        while (
-            not self._stop_event.is_set()
-            and self.acquiring
-            and self.cam is not None
-        ):
+        # Fewer preemptions between image.Release() and GetNextImage()
+        raise_thread_priority(THREAD_PRIORITY_HIGHEST, fifo_priority=10)
+
+        # Bind per-frame lookups once: the loop body holds the GIL, which
+        # the GUI thread also needs, so keep its Python-level work small.
+        # stop() sets _stop_event before it tears down self.cam.
+        cam = self.cam
+        if cam is None:
+            return
+        get_next_image = cam.GetNextImage
+        stop_is_set = self._stop_event.is_set
+        perf_counter_ns = time.perf_counter_ns
+        copyto = np.copyto
+        t0_wall_ns = self._t0_wall_ns
+        t0_mono = self._t0_mono
+
+        while not stop_is_set() and self.acquiring:
             # --------------------------------------------------
-            # START recording (open SpinVideo) if requested
+            # START recording (start recorder thread) if requested,
+            # once the previous recorder has finished writing
             # --------------------------------------------------
-            if self.record_start_requested and not self.recording_active:
-                try:
-                    self.avi_recorder = PySpin.SpinVideo()
-                    opt = PySpin.MJPGOption()
-                    opt.frameRate = self.recording_fps
-                    opt.quality = 75
-                    self.avi_recorder.Open(self.record_filename, opt)
-                    self.recording_active = True
-                except Exception as exc:
-                    print("Error starting recording:", exc)
-                    self.avi_recorder = None
-                    self.recording_active = False
-                finally:
-                    self.record_start_requested = False
+            if (
+                self.record_start_requested
+                and not self.recording_active
+                and (self._record_thread is None or not self._record_thread.is_alive())
+            ):
+                # Re-anchor wall-clock time for each recording, so its
+                # system_time doesn't inherit drift (perf_counter is not
+                # disciplined by NTP) or clock steps since app launch
+                t0_wall_ns = self._t0_wall_ns = time.time_ns()
+                t0_mono = self._t0_mono = perf_counter_ns()
+
+                self._record_q = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+                self._recorder_q = self._record_q
+                self._record_thread = threading.Thread(
+                    target=self._record_worker,
+                    args=(
+                        self._record_q,
+                        self.record_filename,
+                        self.recording_fps,
+                        self.metadata_capacity,
+                    ),
+                    name="RecorderThread",
+                    daemon=True,
+                )
+                self.recording_active = True
+                self.record_start_requested = False
+                self._record_thread.start()
 
             # --------------------------------------------------
-            # STOP recording (close SpinVideo + write CSV) if requested
+            # STOP recording (recorder closes SpinVideo + writes CSV)
             # --------------------------------------------------
             if self.record_stop_requested and self.recording_active:
-                try:
-                    if self.avi_recorder is not None:
-                        self.avi_recorder.Close()
-                except Exception as exc:
-                    print("Error closing recorder:", exc)
-
-                # Write metadata CSV (simple csv module, no pandas)
-                if self.record_filename and self.metadata_records:
-                    csv_path = self.record_filename.rsplit(".", 1)[0] + "_metadata.csv"
-                    fieldnames = [
-                        "record_frame_index",
-                        "camera_frame_id",
-                        "timestamp_us",
-                        "system_time",
-                        "sync_pulse",
-                        "sync_label",
-                    ]
-
-                    try:
-                        with open(csv_path, "w", newline="") as f:
-                            writer = csv.DictWriter(f, fieldnames=fieldnames)
-                            writer.writeheader()
-
-                            for rec in self.metadata_records:
-                                if not isinstance(rec, dict):
-                                    continue
-
-                                row = {
-                                    "record_frame_index": int(rec.get("record_frame_index", 0)),
-                                    "camera_frame_id": (
-                                        "" if rec.get("camera_frame_id") is None
-                                        else int(rec.get("camera_frame_id"))
-                                    ),
-                                    "timestamp_us": (
-                                        "" if rec.get("timestamp_us") is None
-                                        else int(rec.get("timestamp_us"))
-                                    ),
-                                    "system_time": float(rec.get("system_time", 0.0)),
-                                    "sync_pulse": bool(rec.get("sync_pulse", False)),
-                                    "sync_label": "" if rec.get("sync_label") is None else str(rec.get("sync_label")),
-                                }
-                                writer.writerow(row)
-                    except Exception as exc:
-                        print("Error writing metadata CSV:", exc)
+                if self._record_q is not None:
+                    self._finish_record_queue(self._record_q)
+                    self._record_q = None
 
                 # Reset recording state
                 self.recording_active = False
                 self.record_stop_requested = False
-                self.avi_recorder = None
-                self.metadata_records = []
                 self.record_filename = None
 
             # --------------------------------------------------
             # Grab next frame from camera
             # --------------------------------------------------
             try:
-                image = self.cam.GetNextImage()
+                image = get_next_image(GRAB_TIMEOUT_MS)
+            except PySpin.SpinnakerException as exc:
+                timed_out = getattr(exc, "errorcode", None) == SPINNAKER_ERR_TIMEOUT
+                if not timed_out and not stop_is_set():
+                    self._log(f"Error grabbing frame: {exc}")
+                # Timeout (or error): go back and re-check _stop_event
+                continue
             except Exception:
                 continue
 
@@ -391,63 +748,63 @@ class CameraController:
                 continue
 
             # --------------------------------------------------
-            # If recording, append frame + log metadata
+            # Preview: store latest frame (before any handoff,
+            # since the recorder thread releases the image)
             # --------------------------------------------------
-            if self.recording_active and self.avi_recorder is not None:
-                # Determine if this frame is within a sync window
-                now = time.time()
-                with self._sync_lock:
-                    sync_this_frame = now <= self._sync_window_end
-                    sync_label = self._sync_label if sync_this_frame else None
-
-                # Increment only for recorded frames
-                self.frame_counter += 1
+            if self._preview_consumed or not self.skip_unread_preview:
                 try:
-                    self.avi_recorder.Append(image)
-                except Exception as exc:
-                    print("Error appending frame:", exc)
-
-                # --- Check chunk data ---
-                timestamp_us = None
-                frame_id = None
-
-                try:
-                    chunk_data = image.GetChunkData()
-                    if hasattr(chunk_data, "GetTimestamp"):
-                        try:
-                            timestamp_us = chunk_data.GetTimestamp()
-                        except Exception:
-                            timestamp_us = None
-                    if hasattr(chunk_data, "GetFrameID"):
-                        try:
-                            frame_id = chunk_data.GetFrameID()
-                        except Exception:
-                            frame_id = None
-
+                    src = image.GetNDArray()
+                    write_idx = self._preview_write_idx
+                    dst = self._preview_buffers[write_idx]
+                    if dst is None or dst.shape != src.shape or dst.dtype != src.dtype:
+                        # Allocate lazily once shape/dtype are known
+                        dst = np.empty(src.shape, src.dtype)
+                        self._preview_buffers[write_idx] = dst
+                    copyto(dst, src)
+                    # Publish: a single attribute store is atomic under the GIL
+                    self._preview_ready_idx = write_idx
+                    self._preview_write_idx = write_idx ^ 1
+                    self._preview_consumed = False
+                    self._frame_event.set()
                 except Exception:
                     pass
 
-                self.metadata_records.append(
-                    {
-                        "record_frame_index": int(self.frame_counter),
-                        "camera_frame_id": int(frame_id) if frame_id is not None else None,
-                        "timestamp_us": int(timestamp_us) if timestamp_us is not None else None,
-                        "system_time": float(time.time()),
-                        "sync_pulse": bool(sync_this_frame),
-                        "sync_label": sync_label,
-                    }
-                )
-
             # --------------------------------------------------
-            # Preview: store latest frame
+            # If recording, hand frame + metadata to the recorder
             # --------------------------------------------------
-            try:
-                arr = image.GetNDArray()
-                arr = np.array(arr, copy=True)
-                with self._frame_lock:
-                    self._latest_frame = arr
-            except Exception:
-                pass
+            record_q = self._record_q
+            if self.recording_active and record_q is not None:
+                # Determine if this frame is within a sync window
+                now_ns = perf_counter_ns()
+                sync_this_frame = now_ns <= self._sync_window_end_ns
+                sync_label = self._sync_label if sync_this_frame else None
+
+                # --- Camera timestamp and frame ID ---
+                # Read straight from the image, no ChunkData object needed.
+                # Logged as-is (device ticks, ns on these cameras) like the
+                # chunk Timestamp was, so existing analyses keep working.
+                try:
+                    timestamp_us = image.GetTimeStamp()
+                except Exception:
+                    timestamp_us = -1
+                try:
+                    frame_id = image.GetFrameID()
+                except Exception:
+                    frame_id = -1
+
+                try:
+                    # The recorder thread now owns image.Release()
+                    rec = MDRec(
+                        frame_id,
+                        timestamp_us,
+                        t0_wall_ns + (now_ns - t0_mono),
+                        sync_this_frame,
+                        sync_label,
+                    )
+                    record_q.put_nowait((image, rec))
+                    continue
+                except queue.Full:
+                    self.dropped_frames += 1
 
             image.Release()
 
@@ -457,13 +814,50 @@ class CameraController:
 
     def get_latest_frame(self):
         """
-        Return a copy of the latest acquired frame as a NumPy array,
+        Return the latest acquired frame as a NumPy array,
         or None if no frame is available yet.
+
+        The array is one of the preview buffers and is NOT a copy:
+        treat it as read-only and copy it if it must outlive the next frame.
+
+        Marks the frame as consumed, so the acquisition thread publishes
+        the next one (see `skip_unread_preview`).
+        """
+        idx = self._preview_ready_idx
+        if idx < 0:
+            return None
+        self._preview_consumed = True
+        return self._preview_buffers[idx]
+
+    def wait_for_frame(self, timeout: Optional[float] = None):
+        """
+        Block until a new frame is published, then return it like
+        get_latest_frame(). Returns None if none arrives within `timeout`
+        seconds. Meant for a single reader thread (see gui FrameGrabber).
         """
-        with self._frame_lock:
-            if self._latest_frame is None:
-                return None
-            return self._latest_frame.copy()
+        if not self._frame_event.wait(timeout):
+            return None
+        self._frame_event.clear()
+        return self.get_latest_frame()
+
+    # ------------------------------------------------------------------
+    # Messages for the GUI
+    # ------------------------------------------------------------------
+
+    def _log(self, msg: str):
+        self._log_ring.append((time.time(), msg))
+
+    def drain_log(self):
+        """
+        Remove and return all pending (wall_time, message) entries,
+        oldest first. Call from the GUI thread.
+        """
+        entries = []
+        while True:
+            try:
+                entries.append(self._log_ring.popleft())
+            except IndexError:
+                return entries
 
     # ------------------------------------------------------------------
     # Sync pulse logic for logging
@@ -471,13 +865,13 @@ class CameraController:
     def notify_sync_pulse_window(self, width_s: float, label: str):
         """
         Notify that a sync pulse is active for the next `width_s` seconds.
-        Any recorded frame whose system_time is <= this window end
+        Any recorded frame grabbed before this window ends
         will be logged with sync_pulse=True and this label.
         """
-        now = time.time()
-        end_time = now + float(width_s)
+        end_time = time.perf_counter_ns() + int(float(width_s) * 1e9)
 
-        with self._sync_lock:
-            # extend window if overlapping pulses
-            self._sync_window_end = max(self._sync_window_end, end_time)
-            self._sync_label = label
+        # extend window if overlapping pulses; publish the end last so a
+        # reader that sees the new window also sees its label
+        new_end = max(self._sync_window_end_ns, end_time)
+        self._sync_label = label
+        self._sync_window_end_ns = new_end
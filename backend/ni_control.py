@@ -2,112 +2,203 @@
 """
 Cross-platform safe NI-DAQ digital output controller.
 
-- On Windows with NI-DAQmx installed → uses nidaqmx
-- On macOS/Linux → provides a no-op stub
+- On Windows with NI-DAQmx installed → uses nidaqmx (imported on first start())
+- On macOS/Linux → behaves as a no-op stub
 """
 
+from __future__ import annotations
+import functools
 import sys
 import threading
 from dataclasses import dataclass
 
+IS_WINDOWS = sys.platform.startswith("win")
+
+
 @dataclass
 class DOLine:
     line: str = "Dev1/port0/line0"
     idle_low: bool = True
 
 
-if sys.platform.startswith("win"):
+@functools.lru_cache(maxsize=None)
+def _nidaqmx():
+    """
+    Import nidaqmx lazily (it is slow to load and pulls in the NI runtime),
+    once per process, so repeated start/stop cycles don't re-import it.
+    """
     import nidaqmx
-    from nidaqmx.constants import LineGrouping
-
-    class NIDaqDO:
-        def __init__(self, cfg: DOLine | None = None):
-            self.cfg = cfg or DOLine()
-            self._task = None
-            self._lock = threading.Lock()
-            self._started = False
-
-        def start(self):
-            if self._started:
-                return
-            self._task = nidaqmx.Task()
-            self._task.do_channels.add_do_chan(
-                self.cfg.line,
-                line_grouping=LineGrouping.CHAN_PER_LINE,
-            )
+    import nidaqmx.constants
+    import nidaqmx.stream_writers
+    return nidaqmx
+
+
+class NIDaqDO:
+    """
+    Digital output on a single NI-DAQ line.
+
+    On non-Windows platforms there is no hardware: every method is a
+    no-op that just prints what it would have done.
+    """
+    def __init__(self, cfg: DOLine | None = None):
+        self.cfg = cfg or DOLine()
+        self._task = None
+        self._writer = None
+        self._lock = threading.Lock()
+        self._started = False
+        # Cleared the first time the device rejects hardware-timed DO
+        self._hw_timing = True
+        # Pulse width the task is clocked for, or None in on-demand mode.
+        # The task stays in sample-clock mode between pulse_hw() calls and
+        # only goes back to on-demand when a software write needs it.
+        self._hw_width_s = None
+
+    def start(self):
+        if self._started:
+            return
+        if not IS_WINDOWS:
             self._started = True
-            # Set the port to a known state
-            self.set_low() if self.cfg.idle_low else self.set_high()
-
-        def stop(self):
-            if not self._started:
-                return
-
-            # snapshot & mark stopped early (prevents set_* usage elsewhere)
-            t = self._task
+            print("[NIDaqDO] (stub) start called — no hardware available on this OS")
+            return
+
+        nidaqmx = _nidaqmx()
+        self._task = nidaqmx.Task()
+        self._task.do_channels.add_do_chan(
+            self.cfg.line,
+            line_grouping=nidaqmx.constants.LineGrouping.CHAN_PER_LINE,
+        )
+        # Start once so writes don't re-arm the task (auto_start=False)
+        self._task.start()
+        self._writer = nidaqmx.stream_writers.DigitalSingleChannelWriter(
+            self._task.out_stream, auto_start=False
+        )
+        self._started = True
+        # Set the port to a known state
+        self.set_low() if self.cfg.idle_low else self.set_high()
+
+    def stop(self):
+        if not self._started:
+            return
+        if not IS_WINDOWS:
             self._started = False
-            self._task = None
+            print("[NIDaqDO] (stub) stop called — no hardware available on this OS")
+            return
 
-            if t is None:
-                return
+        # snapshot & mark stopped early (prevents set_* usage elsewhere)
+        t = self._task
+        w = self._writer
+        self._started = False
+        self._task = None
+        self._writer = None
 
-            try:
-                with self._lock:
-                    # set known idle state without calling set_high/low (avoids re-entrancy)
-                    idle_val = False if self.cfg.idle_low else True
-                    try:
-                        t.write(idle_val, auto_start=True)
-                    except Exception:
-                        pass
-                    try:
-                        t.close()
-                    except Exception:
-                        pass
-            except Exception:
-                # swallow everything on shutdown
-                pass
-
-        def set_high(self):
-            if not self._started or self._task is None:
-                return
-            with self._lock:
-                t = self._task
-                if t is None:
-                    return
-                t.write(True, auto_start=True)
+        if t is None:
+            return
 
-        def set_low(self):
-            if not self._started or self._task is None:
-                return
+        try:
             with self._lock:
-                t = self._task
-                if t is None:
-                    return
-                t.write(False, auto_start=True)
-
-else:
-    # --- Stub version for macOS/Linux ---
-    class NIDaqDO:
-        """Dummy NI-DAQ controller for non-Windows platforms."""
-        def __init__(self, cfg: DOLine | None = None):
-            self.cfg = cfg or DOLine()
-            self._started = False
-
-        def start(self):
-            self._started = True
-            print("[NIDaqDO] (stub) start called — no hardware available on this OS")
-
-        def stop(self):
-            self._started = False
-            print("[NIDaqDO] (stub) stop called — no hardware available on this OS")
-
-        def set_high(self):
-            if not self._started:
-                return
+                if self._hw_width_s is not None:
+                    self._restore_on_demand(t, _nidaqmx().constants)
+                # set known idle state without calling set_high/low (avoids re-entrancy)
+                idle_val = False if self.cfg.idle_low else True
+                try:
+                    w.write_one_sample_one_line(idle_val)
+                except Exception:
+                    pass
+                try:
+                    t.close()
+                except Exception:
+                    pass
+        except Exception:
+            # swallow everything on shutdown
+            pass
+
+    def set_high(self):
+        if not self._started:
+            return
+        if not IS_WINDOWS:
             # no actual hardware, just print for debug
             print("[NIDaqDO] (stub) set HIGH")
-
-        def set_low(self):
-            if not self._started:
+            return
+        with self._lock:
+            w = self._writer
+            if w is None:
                 return
+            if self._hw_width_s is not None:
+                self._restore_on_demand(self._task, _nidaqmx().constants)
+            w.write_one_sample_one_line(True)
+
+    def set_low(self):
+        if not self._started:
+            return
+        if not IS_WINDOWS:
             print("[NIDaqDO] (stub) set LOW")
+            return
+        with self._lock:
+            w = self._writer
+            if w is None:
+                return
+            if self._hw_width_s is not None:
+                self._restore_on_demand(self._task, _nidaqmx().constants)
+            w.write_one_sample_one_line(False)
+
+    def pulse_hw(self, width_s: float) -> bool:
+        """
+        Emit one pulse timed by the DAQ sample clock instead of the CPU:
+        a finite 2-sample waveform (active, idle) clocked at 1/width_s,
+        so the line is active for exactly one sample period. Blocks until
+        the board reports the task done.
+
+        The task is left in sample-clock mode, so back-to-back pulses of
+        the same width only rewrite the two samples and restart it; the
+        timing is reconfigured only when the width changes. set_high() /
+        set_low() switch back to on-demand mode when next called.
+
+        Returns False without pulsing when hardware timing is unavailable
+        (stub / non-Windows, or a device without hardware-timed DO), so
+        the caller can fall back to software timing. Once the task has
+        started it returns True, even if waiting for it to finish fails.
+        """
+        if not IS_WINDOWS or not self._started or not self._hw_timing:
+            return False
+
+        constants = _nidaqmx().constants
+        active = self.cfg.idle_low  # active level is the opposite of idle
+        with self._lock:
+            t = self._task
+            if t is None:
+                return False
+            try:
+                t.stop()
+                if self._hw_width_s != width_s:
+                    t.timing.cfg_samp_clk_timing(
+                        rate=1.0 / width_s,
+                        sample_mode=constants.AcquisitionType.FINITE,
+                        samps_per_chan=2,
+                    )
+                    self._hw_width_s = width_s
+                t.write([active, not active], auto_start=False)
+                t.start()
+            except Exception as exc:
+                print(f"[NIDaqDO] hardware-timed pulses unavailable, using software timing: {exc}")
+                self._hw_timing = False
+                self._restore_on_demand(t, constants)
+                return False
+
+            # The waveform is on its way: from here on report the pulse as
+            # sent, or the caller's software fallback would emit a second one
+            try:
+                t.wait_until_done(timeout=width_s + 1.0)
+            except Exception as exc:
+                print(f"[NIDaqDO] Error waiting for hardware-timed pulse: {exc}")
+                self._restore_on_demand(t, constants)
+        return True
+
+    def _restore_on_demand(self, t, constants):
+        """Put the task back into on-demand (software-written) mode."""
+        self._hw_width_s = None
+        try:
+            t.stop()
+            t.timing.samp_timing_type = constants.SampleTimingType.ON_DEMAND
+            t.start()
+        except Exception as exc:
+            print(f"[NIDaqDO] Error restoring on-demand mode: {exc}")
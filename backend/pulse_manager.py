@@ -1,19 +1,43 @@
 # backend/pulse_manager.py
 
 from __future__ import annotations
+import sys
 import threading
 import time
-import queue
-from dataclasses import dataclass
+from collections import deque
 from typing import Optional
 
 from backend.ni_control import NIDaqDO, DOLine
+from backend.thread_priority import THREAD_PRIORITY_TIME_CRITICAL, raise_thread_priority
 
+# Pulse timing: sleep until COARSE_MARGIN_NS before the deadline, yield
+# until SPIN_SLACK_NS before it, then busy-spin on perf_counter_ns().
+COARSE_MARGIN_NS = 2_000_000   # OS sleep may overshoot by ~1 ms (1 ms timer)
+SPIN_SLACK_NS = 200_000
 
-@dataclass
-class PulseRequest:
-    width_s: float
-    label: Optional[str] = None
+# Shortest pulse we emit; narrower requests are stretched to this
+# (above a 100 kHz DO sample clock, and well below software jitter)
+MIN_PULSE_WIDTH_NS = 10_000
+
+
+def _sleep_until_ns(deadline_ns: int):
+    """Block until time.perf_counter_ns() reaches deadline_ns."""
+    remaining = deadline_ns - time.perf_counter_ns()
+    if remaining > COARSE_MARGIN_NS:
+        time.sleep((remaining - COARSE_MARGIN_NS) / 1e9)
+    while time.perf_counter_ns() < deadline_ns - SPIN_SLACK_NS:
+        time.sleep(0)
+    while time.perf_counter_ns() < deadline_ns:
+        pass
+
+
+# Queue health (see PulseManager.stats): EMA weight of each new depth
+# sample, and how many request->start latencies the percentiles cover
+DEPTH_EMA_ALPHA = 0.05
+LATENCY_WINDOW = 256
+
+# Fields of a request slot in PulseManager's ring
+_WIDTH, _LABEL, _KEY, _T_REQ = range(4)
 
 
 class PulseManager:
@@ -21,25 +45,63 @@ class PulseManager:
     Dedicated thread that controls digital pulses on a NI-DAQ DO line.
 
     - Non-blocking API:
-        request_pulse(width_s=..., label="...")
+        request_pulse_ns(width_ns=..., label="...")
+        request_pulse(width_s=..., label="...")  (seconds wrapper)
     - Uses NIDaqDO for the actual hardware.
     - Keeps track of whether a pulse is currently active (is_pulse_active).
+    - Bounded backlog: at most `max_queue` pending pulses (oldest dropped),
+      and requests sharing a coalesce_key replace each other while queued.
+    - Queue health via stats(); warns once each time the backlog reaches
+      `warn_depth`.
     """
-    def __init__(self, daq: Optional[NIDaqDO] = None, default_width_s: float = 0.005):
+    def __init__(
+        self,
+        daq: Optional[NIDaqDO] = None,
+        default_width_s: float = 0.005,
+        max_queue: int = 8,
+        core_id: Optional[int] = None,
+        warn_depth: Optional[int] = None,
+    ):
         """
         Args:
             daq: An initialized NIDaqDO instance. If None, a default one is created.
-            default_width_s: default pulse width for request_pulse() calls.
+            default_width_s: default pulse width when none is requested.
+            max_queue: max pending pulses; when full, the oldest is dropped.
+            core_id: if set, pin the pulse thread to this CPU core.
+            warn_depth: backlog depth that triggers a warning
+                (default: 3/4 of max_queue).
         """
-        self.default_width_s = float(default_width_s)
-        if self.default_width_s <= 0:
+        if default_width_s <= 0:
             raise ValueError("default_width_s must be > 0.")
+        self.default_width_ns = int(round(default_width_s * 1e9))
+        self.max_queue = int(max_queue)
+        if self.max_queue < 1:
+            raise ValueError("max_queue must be >= 1.")
+        self.core_id = core_id
+        self.warn_depth = (
+            max(1, self.max_queue * 3 // 4) if warn_depth is None else int(warn_depth)
+        )
 
         self.daq = daq or NIDaqDO(DOLine(line="Dev1/port0/line0", idle_low=True))
 
-        self._queue: "queue.Queue[PulseRequest]" = queue.Queue()
+        # Pending requests: a ring of preallocated [width_ns, label,
+        # coalesce_key, request_time_ns] slots, filled in place so
+        # requesting a pulse allocates nothing. _head/_tail count slots
+        # written/read and are guarded by _cv; the worker sleeps on _cv
+        # until one arrives.
+        self._ring = [[0, None, None, 0] for _ in range(self.max_queue)]
+        self._head = 0
+        self._tail = 0
+        self._cv = threading.Condition()
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self.dropped_pulses = 0  # requests discarded because the queue was full
+
+        # Queue health, guarded by _cv (see stats())
+        self._depth_ema = 0.0
+        self._depth_max = 0
+        self._depth_warned = False
+        self._latencies_ns = deque(maxlen=LATENCY_WINDOW)
 
         self._pulse_active = False
         self._state_lock = threading.Lock()
@@ -59,6 +121,15 @@ class PulseManager:
         # Start the DAQ hardware (no-op on stub/mac)
         self.daq.start()
 
+        # 1 ms system timer resolution while pulses may be sent (Windows
+        # defaults to ~15.6 ms, far coarser than our pulse widths)
+        if sys.platform.startswith("win"):
+            try:
+                import ctypes
+                ctypes.windll.winmm.timeBeginPeriod(1)
+            except Exception:
+                pass
+
         self._stop_event.clear()
         self._thread = threading.Thread(
             target=self._run,
@@ -76,13 +147,11 @@ class PulseManager:
         if not self._started:
             return
 
-        self._stop_event.set()
-
-        # Wake the queue if it's waiting
-        try:
-            self._queue.put_nowait(PulseRequest(width_s=0.0, label="__shutdown__"))
-        except Exception:
-            pass
+        # Wake the worker if it's waiting; pending pulses are discarded
+        with self._cv:
+            self._stop_event.set()
+            self._tail = self._head
+            self._cv.notify_all()
 
         if self._thread is not None:
             try:
@@ -100,28 +169,112 @@ class PulseManager:
         with self._state_lock:
             self._pulse_active = False
 
+        if sys.platform.startswith("win"):
+            try:
+                import ctypes
+                ctypes.windll.winmm.timeEndPeriod(1)
+            except Exception:
+                pass
+
         self._started = False
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
-    def request_pulse(self, width_s: float | None = None, label: str | None = None):
+    def request_pulse_ns(
+        self,
+        width_ns: int | None = None,
+        label: str | None = None,
+        coalesce_key: str | None = None,
+    ):
         """
         Queue a pulse request. Returns immediately (non-blocking).
 
         Args:
-            width_s: pulse width in seconds. If None, uses default_width_s.
+            width_ns: pulse width in nanoseconds. If None, uses the default
+                width. Widths below MIN_PULSE_WIDTH_NS are stretched to it.
             label: optional tag to identify the pulse type (for logging/debug).
+            coalesce_key: if set and a request with the same key is still
+                queued, replace that request instead of adding another one.
         """
         if not self._started:
             raise RuntimeError("PulseManager not started. Call .start() first.")
 
-        w = self.default_width_s if width_s is None else float(width_s)
+        w = self.default_width_ns if width_ns is None else int(width_ns)
         if w <= 0:
             return  # ignore zero/negative pulses
-
-        req = PulseRequest(width_s=w, label=label)
-        self._queue.put(req)
+        if w < MIN_PULSE_WIDTH_NS:
+            w = MIN_PULSE_WIDTH_NS
+
+        ring = self._ring
+        size = self.max_queue
+        warning = None
+        with self._cv:
+            if coalesce_key is not None:
+                for i in range(self._tail, self._head):
+                    slot = ring[i % size]
+                    if slot[_KEY] == coalesce_key:
+                        slot[_WIDTH] = w
+                        slot[_LABEL] = label
+                        return
+            if self._head - self._tail >= size:
+                self._tail += 1  # drop the oldest
+                self.dropped_pulses += 1
+            slot = ring[self._head % size]
+            slot[_WIDTH] = w
+            slot[_LABEL] = label
+            slot[_KEY] = coalesce_key
+            slot[_T_REQ] = time.perf_counter_ns()
+            self._head += 1
+            self._cv.notify()
+
+            depth = self._head - self._tail
+            self._depth_ema += DEPTH_EMA_ALPHA * (depth - self._depth_ema)
+            if depth > self._depth_max:
+                self._depth_max = depth
+            if depth >= self.warn_depth:
+                if not self._depth_warned:
+                    self._depth_warned = True
+                    warning = (
+                        f"[PulseManager] Pulse backlog at {depth}/{size} "
+                        f"(dropped so far: {self.dropped_pulses})"
+                    )
+            else:
+                self._depth_warned = False
+
+        # Printed outside _cv: a blocked stdout must not hold up the
+        # pulse thread, which needs the lock to take the next request
+        if warning is not None:
+            print(warning)
+
+    def request_pulse(
+        self,
+        width_s: float | None = None,
+        label: str | None = None,
+        coalesce_key: str | None = None,
+    ):
+        """Same as request_pulse_ns(), with the width in seconds."""
+        width_ns = None if width_s is None else int(round(width_s * 1e9))
+        self.request_pulse_ns(width_ns, label=label, coalesce_key=coalesce_key)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of queue health: current/EMA/max backlog depth, dropped
+        requests, and request->pulse-start latency percentiles (ms) over
+        the last LATENCY_WINDOW pulses (None before the first pulse).
+        """
+        with self._cv:
+            lat = sorted(self._latencies_ns)
+            out = {
+                "depth": self._head - self._tail,
+                "depth_ema": self._depth_ema,
+                "depth_max": self._depth_max,
+                "dropped": self.dropped_pulses,
+            }
+        for name, q in (("latency_p50_ms", 0.50), ("latency_p95_ms", 0.95),
+                        ("latency_p99_ms", 0.99)):
+            out[name] = lat[min(len(lat) - 1, int(q * len(lat)))] / 1e6 if lat else None
+        return out
 
     @property
     def is_pulse_active(self) -> bool:
@@ -137,23 +290,43 @@ class PulseManager:
     # Worker loop
     # ------------------------------------------------------------------
     def _run(self):
+        # Keep the scheduler from stretching the HIGH interval
+        raise_thread_priority(
+            THREAD_PRIORITY_TIME_CRITICAL, fifo_priority=20, core_id=self.core_id
+        )
         idle_low = getattr(self.daq.cfg, "idle_low", True)
 
-        while not self._stop_event.is_set():
-            try:
-                req = self._queue.get(timeout=0.1)
-            except queue.Empty:
-                continue
+        ring = self._ring
+        size = self.max_queue
 
-            # Shutdown sentinel
-            if self._stop_event.is_set() or req.label == "__shutdown__":
-                break
+        while True:
+            with self._cv:
+                while self._head == self._tail and not self._stop_event.is_set():
+                    self._cv.wait()
+                if self._stop_event.is_set():
+                    return
+                slot = ring[self._tail % size]
+                width_ns = slot[_WIDTH]
+                self._latencies_ns.append(time.perf_counter_ns() - slot[_T_REQ])
+                self._tail += 1
 
             # Apply the pulse
+            hw_pulsed = False
             try:
                 with self._state_lock:
                     self._pulse_active = True
 
+                # Preferred: let the DAQ clock time the pulse. Returns False
+                # when unsupported (stub, no hardware-timed DO) → software.
+                # The waveform already ends idle, so no write follows it
+                # (that would switch the task back to on-demand mode).
+                try:
+                    if self.daq.pulse_hw(width_ns / 1e9):
+                        hw_pulsed = True
+                        continue
+                except Exception as e:
+                    print(f"[PulseManager] Error in hardware-timed pulse: {e}")
+
                 # HIGH
                 try:
                     if idle_low:
@@ -164,17 +337,21 @@ class PulseManager:
                     print(f"[PulseManager] Error setting HIGH: {e}")
                     continue
 
-                time.sleep(req.width_s)
+                # Hold until an absolute deadline (perf_counter_ns), not
+                # time.sleep(width), which overshoots by up to a timer tick
+                deadline_ns = time.perf_counter_ns() + width_ns
+                _sleep_until_ns(deadline_ns)
 
             finally:
                 # Back to idle
-                try:
-                    if idle_low:
-                        self.daq.set_low()
-                    else:
-                        self.daq.set_high()
-                except Exception as e:
-                    print(f"[PulseManager] Error setting LOW: {e}")
+                if not hw_pulsed:
+                    try:
+                        if idle_low:
+                            self.daq.set_low()
+                        else:
+                            self.daq.set_high()
+                    except Exception as e:
+                        print(f"[PulseManager] Error setting LOW: {e}")
 
                 with self._state_lock:
                     self._pulse_active = False
@@ -0,0 +1,47 @@
+# backend/thread_priority.py
+"""
+Best-effort scheduling tweaks for the calling thread.
+
+- On Windows → SetThreadPriority / SetThreadAffinityMask
+- On POSIX → SCHED_FIFO / sched_setaffinity (SCHED_FIFO needs
+  CAP_SYS_NICE or root; silently skipped otherwise)
+"""
+
+import os
+import sys
+
+THREAD_PRIORITY_HIGHEST = 2
+THREAD_PRIORITY_TIME_CRITICAL = 15
+
+
+def raise_thread_priority(win_priority: int, fifo_priority: int, core_id: int | None = None):
+    """
+    Raise the calling thread's priority and optionally pin it to one core.
+
+    Args:
+        win_priority: Windows thread priority (e.g. THREAD_PRIORITY_HIGHEST).
+        fifo_priority: POSIX SCHED_FIFO priority (1-99).
+        core_id: if given, restrict the thread to this CPU core.
+    """
+    if sys.platform.startswith("win"):
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            thread = kernel32.GetCurrentThread()
+            kernel32.SetThreadPriority(thread, win_priority)
+            if core_id is not None:
+                kernel32.SetThreadAffinityMask(thread, 1 << core_id)
+        except Exception:
+            pass
+        return
+
+    # pid 0 = the calling thread on Linux
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(fifo_priority))
+    except Exception:
+        pass
+    if core_id is not None:
+        try:
+            os.sched_setaffinity(0, {core_id})
+        except Exception:
+            pass
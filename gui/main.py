@@ -1,6 +1,9 @@
 import atexit
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import cv2
+import numpy as np
 from PySide6.QtWidgets import (
     QApplication,
     QWidget,
@@ -9,16 +12,20 @@ from PySide6.QtWidgets import (
     QPushButton,
     QLabel,
 )
-from PySide6.QtCore import QTimer, Qt
+from PySide6.QtCore import QEvent, QThread, QTimer, Qt, Signal
 from PySide6.QtGui import QImage, QPixmap
 from enum import Enum, auto
 from datetime import datetime
 
 from backend.camera_control import detect_first_camera, CameraController
-from backend.ni_control import NIDaqDO, DOLine
+from backend.ni_control import IS_WINDOWS, NIDaqDO, DOLine
 from backend.pulse_manager import PulseManager
 
 SYNC_WIDTH_RECORD = 0.100  # 100 ms
+HAS_DAQ = IS_WINDOWS  # NI-DAQ sync pulses are only supported on Windows
+LOG_POLL_MS = 200  # how often camera/recorder messages are printed
+RECORD_START_POLL_MS = 5  # check for the recorder having started
+PULSE_STATS_MS = 2000  # how often the pulse queue health label refreshes
 
 class AppState(Enum):
     IDLE = auto()
@@ -26,36 +33,120 @@ class AppState(Enum):
     PREVIEWING = auto()
     RECORDING = auto()
 
+CAMERA_PROBE_INDICES = range(5)
+
+
+def _try_open(index):
+    """Open camera `index`, read its basic properties and release it."""
+    # DirectShow enumerates much faster than the default MSMF backend
+    api = cv2.CAP_DSHOW if IS_WINDOWS else cv2.CAP_ANY
+    cap = cv2.VideoCapture(index, api)
+    try:
+        if not cap.isOpened():
+            return index, False, 0, 0, 0.0
+        return (
+            index,
+            True,
+            cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+            cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+            cap.get(cv2.CAP_PROP_FPS),
+        )
+    finally:
+        cap.release()
+
+
 def detect_camera():
     """
-    Try to find the first available camera (index 0–4).
+    Try to find an available camera (index 0–4), probing all indices
+    in parallel since each open can block for a second or more.
     Print basic info to the terminal.
     Returns True if a camera is found, False otherwise.
     """
     print("=== Detecting camera ===")
-    for index in range(5):
-        cap = cv2.VideoCapture(index)
-        if cap.isOpened():
-            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            fps = cap.get(cv2.CAP_PROP_FPS)
+    ex = ThreadPoolExecutor(max_workers=len(CAMERA_PROBE_INDICES))
+    try:
+        futures = [ex.submit(_try_open, i) for i in CAMERA_PROBE_INDICES]
+        for future in as_completed(futures):
+            try:
+                index, opened, width, height, fps = future.result()
+            except Exception:
+                continue
+            if not opened:
+                continue
 
             print(f"Found camera at index {index}")
             print(f"  Resolution: {int(width)} x {int(height)}")
             print(f"  FPS (reported): {fps:.2f}")
-
-            cap.release()
             print("=== Detection done ===\n")
             return True
-
-        cap.release()
+    finally:
+        # Don't wait for the remaining probes; they release their own capture
+        ex.shutdown(wait=False, cancel_futures=True)
 
     print("No suitable camera found.")
     print("=== Detection done ===\n")
     return False
 
 
+class FrameGrabber(QThread):
+    """
+    Waits for preview frames off the GUI thread and emits frameReady only
+    when a new one has arrived. A frame is not emitted until the GUI has
+    finished with the previous one (frame_done), so a slow GUI drops frames
+    instead of queueing them.
+    """
+    frameReady = Signal(object)
+
+    def __init__(self, camera, parent=None):
+        super().__init__(parent)
+        self.camera = camera
+        self._stop_event = threading.Event()
+        self._gui_ready = threading.Event()
+        self._gui_ready.set()
+        self._active = threading.Event()  # cleared while paused
+        self._active.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if not self._active.wait(0.1) or not self._gui_ready.wait(0.1):
+                continue
+            frame = self.camera.wait_for_frame(timeout=0.1)
+            if frame is None:
+                continue
+            self._gui_ready.clear()
+            self.frameReady.emit(frame)
+
+    def set_paused(self, paused: bool):
+        """Stop fetching frames (e.g. while the window is minimized)."""
+        if paused:
+            self._active.clear()
+        else:
+            self._active.set()
+
+    def frame_done(self):
+        """Called by the GUI once it no longer needs the emitted frame."""
+        self._gui_ready.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self.wait()
+
+
 class MainWindow(QWidget):
+    # Button configuration per state:
+    # (detect enabled, preview enabled, preview text, record enabled, record text)
+    _STATE_TABLE = {
+        AppState.IDLE:
+            (True, False, "Start Preview", False, "Start Recording"),
+        AppState.CAMERA_DETECTED:
+            (True, True, "Start Preview", False, "Start Recording"),
+        AppState.PREVIEWING:
+            (False, True, "Stop Preview", True, "Start Recording"),
+        # While recording, keep preview button disabled
+        AppState.RECORDING:
+            (False, False, "Stop Preview", True, "Stop Recording"),
+    }
+
     def __init__(self):
         super().__init__()
 
@@ -78,9 +169,15 @@ class MainWindow(QWidget):
         self.connect_daq_button.clicked.connect(self.on_connect_daq_clicked)
         layout.addWidget(self.connect_daq_button)
 
-        # Disable the button on non-Windows
-        if not sys.platform.startswith("win"):
-            self.connect_daq_button.setEnabled(False)
+        # Pulse queue health (filled in once the PulseManager runs)
+        self.pulse_stats_label = QLabel("")
+        layout.addWidget(self.pulse_stats_label)
+        self.pulse_stats_timer = QTimer(self)
+        self.pulse_stats_timer.timeout.connect(self.update_pulse_stats)
+
+        # Sync UI always exists; it is only usable where a DAQ can be
+        self.connect_daq_button.setEnabled(HAS_DAQ)
+        if not HAS_DAQ:
             self.sync_label.setText("Sync not available on this OS")
 
         # Handle to the DAQ controller (set on connect)
@@ -92,6 +189,7 @@ class MainWindow(QWidget):
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.setFixedSize(640, 480)
         layout.addWidget(self.image_label)
+        self._label_size = self.image_label.size()  # refreshed in resizeEvent
 
         # --- Controls row: Preview / Record / Sync ---
         self.preview_button = QPushButton("Start Preview")
@@ -112,11 +210,20 @@ class MainWindow(QWidget):
 
         layout.addLayout(controls_row)
 
-        # --- Camera controller + timer ---
+        # --- Camera controller + frame grabber ---
         self.camera = CameraController()
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_frame)
+        self.grabber = None  # FrameGrabber, created when preview starts
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.print_camera_log)
+        self.log_timer.start(LOG_POLL_MS)
+        self.record_start_timer = QTimer(self)
+        self.record_start_timer.setInterval(RECORD_START_POLL_MS)
+        self.record_start_timer.timeout.connect(self._on_record_start_poll)
         self.preview_running = False
+        self._current_frame = None  # buffer behind the current QImage
+        self._qimg_cache = {}  # (buffer address, layout) -> QImage header
+        self._rgb_buf = None  # colour frames converted to RGB, allocated lazily
+        self._scaled_buf = None  # frame resized to the label, allocated lazily
 
         self.state = AppState.IDLE
         self._apply_state()
@@ -125,34 +232,13 @@ class MainWindow(QWidget):
         self.manual_sync_count = 0
 
     def _apply_state(self):
-        if self.state == AppState.IDLE:
-            self.detect_button.setEnabled(True)
-            self.preview_button.setEnabled(False)
-            self.preview_button.setText("Start Preview")
-            self.record_button.setEnabled(False)
-            self.record_button.setText("Start Recording")
-
-        elif self.state == AppState.CAMERA_DETECTED:
-            self.detect_button.setEnabled(True)
-            self.preview_button.setEnabled(True)
-            self.preview_button.setText("Start Preview")
-            self.record_button.setEnabled(False)
-            self.record_button.setText("Start Recording")
-
-        elif self.state == AppState.PREVIEWING:
-            self.detect_button.setEnabled(False)
-            self.preview_button.setEnabled(True)
-            self.preview_button.setText("Stop Preview")
-            self.record_button.setEnabled(True)
-            self.record_button.setText("Start Recording")
-
-        elif self.state == AppState.RECORDING:
-            self.detect_button.setEnabled(False)
-            # While recording, keep preview button disabled
-            self.preview_button.setEnabled(False)
-            self.preview_button.setText("Stop Preview")
-            self.record_button.setEnabled(True)
-            self.record_button.setText("Stop Recording")
+        (detect_en, preview_en, preview_text,
+         record_en, record_text) = self._STATE_TABLE[self.state]
+        self.detect_button.setEnabled(detect_en)
+        self.preview_button.setEnabled(preview_en)
+        self.preview_button.setText(preview_text)
+        self.record_button.setEnabled(record_en)
+        self.record_button.setText(record_text)
 
     def on_detect_clicked(self):
         if self.state not in (AppState.IDLE, AppState.CAMERA_DETECTED):
@@ -184,6 +270,7 @@ class MainWindow(QWidget):
             self.sync_label.setText("Sync available — DAQ connected")
             self.connect_daq_button.setEnabled(False)
             self.sync_button.setEnabled(True)
+            self.pulse_stats_timer.start(PULSE_STATS_MS)
 
         except Exception as e:
             # Keep it silent in UI per your preference; show brief text
@@ -192,6 +279,21 @@ class MainWindow(QWidget):
             self.pulse_manager = None
             self.sync_button.setEnabled(False)
 
+    def update_pulse_stats(self):
+        if self.pulse_manager is None:
+            return
+        st = self.pulse_manager.stats()
+        text = (
+            f"Pulse queue: depth {st['depth']} (avg {st['depth_ema']:.1f}, "
+            f"max {st['depth_max']}), dropped {st['dropped']}"
+        )
+        if st["latency_p50_ms"] is not None:
+            text += (
+                f" — latency p50 {st['latency_p50_ms']:.1f} ms, "
+                f"p99 {st['latency_p99_ms']:.1f} ms"
+            )
+        self.pulse_stats_label.setText(text)
+
     def on_sync_pulse_clicked(self):
         """Send a sync pulse.
 
@@ -200,12 +302,13 @@ class MainWindow(QWidget):
         """
         # If NOT recording, just send a test pulse (no logging window)
         if self.state != AppState.RECORDING:
-            if self.pulse_manager is not None and sys.platform.startswith("win"):
+            if self.pulse_manager is not None and HAS_DAQ:
                 try:
                     # Use a short test pulse
                     self.pulse_manager.request_pulse(
                         width_s=SYNC_WIDTH_RECORD,
                         label="test_pulse",
+                        coalesce_key="test_pulse",  # clicks don't pile up
                     )
                     self.sync_label.setText("Test pulse sent (no logging, not recording).")
                 except Exception as e:
@@ -224,7 +327,7 @@ class MainWindow(QWidget):
 
         try:
             # hardware pulse
-            if self.pulse_manager is not None and sys.platform.startswith("win"):
+            if self.pulse_manager is not None and HAS_DAQ:
                 self.pulse_manager.request_pulse(width_s=width, label=label)
 
             # logging window
@@ -241,9 +344,12 @@ class MainWindow(QWidget):
             if not ok:
                 return
 
-            # This controls PREVIEW fps, not camera fps.
-            # 33 ms ~ 30 fps, 16 ms ~ 60 fps, 8 ms ~ 90 fps.
-            self.timer.start(8)
+            # Frames are pushed to update_frame as they arrive (queued
+            # connection, so it runs on the GUI thread)
+            self.grabber = FrameGrabber(self.camera, self)
+            self.grabber.frameReady.connect(self.update_frame)
+            self.grabber.set_paused(self.isMinimized())
+            self.grabber.start()
             self.preview_running = True
             self.preview_button.setText("Stop Preview")
             self.state = AppState.PREVIEWING
@@ -254,10 +360,12 @@ class MainWindow(QWidget):
             # Only allow stopping preview when NOT recording
             if self.state == AppState.RECORDING:
                 return  # safety, shouldn't happen if buttons are disabled correctly
-            self.timer.stop()
+            self._stop_grabber()
             self.camera.stop()
+            self.print_camera_log()  # whatever the recorder said on shutdown
             self.preview_running = False
             self.image_label.setPixmap(QPixmap())
+            self._qimg_cache.clear()  # drop headers over the camera's buffers
             self.image_label.setText("No video")
             self.status_label.setText("Preview stopped.")
             self.state = AppState.CAMERA_DETECTED
@@ -274,21 +382,9 @@ class MainWindow(QWidget):
             self.status_label.setText(msg)
 
             if ok:
-                # 1) fire a 100 ms hardware pulse
-                if self.pulse_manager is not None and sys.platform.startswith("win"):
-                    try:
-                        self.pulse_manager.request_pulse(
-                            width_s=SYNC_WIDTH_RECORD,
-                            label="record_start",
-                        )
-                    except Exception as e:
-                        print("Record-start pulse failed:", e)
-
-                # 2) tell the camera to mark frames in this window
-                self.camera.notify_sync_pulse_window(
-                    width_s=SYNC_WIDTH_RECORD,
-                    label="record_start",
-                )
+                # The record_start pulse goes out once the recorder is
+                # actually running (see _on_record_start_poll)
+                self.record_start_timer.start()
 
                 self.manual_sync_count = 0  # reset manual counter
 
@@ -297,43 +393,139 @@ class MainWindow(QWidget):
 
         # Stop recording
         elif self.state == AppState.RECORDING:
+            self.record_start_timer.stop()
             self.camera.stop_recording()
             self.status_label.setText("Recording stopped.")
             self.state = AppState.PREVIEWING
             self._apply_state()
 
-    def update_frame(self):
-        frame = self.camera.get_latest_frame()
-        if frame is None:
+    def _on_record_start_poll(self):
+        # A new recording may wait for the previous recorder to finish
+        # writing; mark its start only when its frames are being recorded,
+        # so the sync window isn't over before the first one
+        if not self.camera.recording_started:
+            return
+        self.record_start_timer.stop()
+
+        # 1) fire a 100 ms hardware pulse
+        if self.pulse_manager is not None and HAS_DAQ:
+            try:
+                self.pulse_manager.request_pulse(
+                    width_s=SYNC_WIDTH_RECORD,
+                    label="record_start",
+                )
+            except Exception as e:
+                print("Record-start pulse failed:", e)
+
+        # 2) tell the camera to mark frames in this window
+        self.camera.notify_sync_pulse_window(
+            width_s=SYNC_WIDTH_RECORD,
+            label="record_start",
+        )
+
+    def print_camera_log(self):
+        # Print camera/recorder messages here, off the capture threads
+        for _, msg in self.camera.drain_log():
+            print(msg)
+
+    def _stop_grabber(self):
+        if self.grabber is not None:
+            self.grabber.stop()
+            self.grabber = None
+
+    def update_frame(self, frame):
+        if self.grabber is None:
+            return  # queued before preview was stopped
+        try:
+            # Nothing would be rendered; skip the conversion and scaling
+            if self.image_label.isVisible() and not self.isMinimized():
+                self._show_frame(frame)
+        finally:
+            # Let the grabber hand over the next frame
+            self.grabber.frame_done()
+
+    def _show_frame(self, frame):
+        if frame.ndim not in (2, 3) or (frame.ndim == 3 and frame.shape[2] != 3):
+            # Fallback: just bail if format is unexpected
             return
 
+        # Scale first, with OpenCV into a reused buffer, so the colour
+        # conversion below runs on the (usually smaller) preview image
+        height, width = frame.shape[:2]
+        target = self._label_size
+        scale = min(target.width() / width, target.height() / height)
+        out_w = max(1, round(width * scale))
+        out_h = max(1, round(height * scale))
+        if (out_w, out_h) != (width, height):
+            shape = (out_h, out_w) + frame.shape[2:]
+            scaled = self._scaled_buf
+            if scaled is None or scaled.shape != shape or scaled.dtype != frame.dtype:
+                scaled = self._scaled_buf = np.empty(shape, frame.dtype)
+            cv2.resize(
+                frame, (out_w, out_h), dst=scaled,
+                interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR,
+            )
+            frame = scaled
+            height, width = out_h, out_w
+
         # Handle grayscale vs color
         if frame.ndim == 2:
-            height, width = frame.shape
-            bytes_per_line = width
-            qimg = QImage(
-                frame.data, width, height, bytes_per_line, QImage.Format.Format_Grayscale8
-            ).copy()
+            # Wrapped in place, so it must be one contiguous block (the
+            # camera's preview buffers are; copy only strided views)
+            if not frame.flags.c_contiguous:
+                frame = np.ascontiguousarray(frame)
+            bytes_per_line = frame.strides[0]
+            qimg = self._wrap_qimage(
+                frame, width, height, bytes_per_line, QImage.Format.Format_Grayscale8
+            )
         else:
-            height, width, channels = frame.shape
-            if channels == 3:
-                bytes_per_line = 3 * width
-                qimg = QImage(
-                    frame.data,
-                    width,
-                    height,
-                    bytes_per_line,
-                    QImage.Format.Format_RGB888,
-                ).rgbSwapped().copy()
-            else:
-                # Fallback: just bail if format is unexpected
-                return
-
-        pixmap = QPixmap.fromImage(qimg)
-        self.image_label.setPixmap(pixmap.scaled(
-            self.image_label.size(), Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        ))
+            # BGR -> RGB with OpenCV (SIMD) into a reused buffer,
+            # instead of QImage.rgbSwapped() allocating a new image
+            rgb = self._rgb_buf
+            if rgb is None or rgb.shape != frame.shape:
+                rgb = self._rgb_buf = np.empty(frame.shape, np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+            bytes_per_line = 3 * width
+            qimg = self._wrap_qimage(
+                rgb, width, height, bytes_per_line, QImage.Format.Format_RGB888
+            )
+
+        # The QImage wraps `frame` (or _rgb_buf) without copying it; keep
+        # it referenced until the pixmap has been built. The camera doesn't
+        # refill it until the grabber fetches the frame after next.
+        self._current_frame = frame
+
+        # A fresh pixmap each frame: refilling one the label still shares
+        # would first deep-copy it (detach), which is slower
+        self.image_label.setPixmap(QPixmap.fromImage(qimg))
+
+    def _wrap_qimage(self, buf, width, height, bytes_per_line, fmt):
+        """
+        Return a QImage header over `buf` (no copy), reusing the one built
+        for the same buffer and layout last time. `buf` is usually one of
+        a few stable arrays: _scaled_buf when the frame was resized,
+        _rgb_buf for colour frames, or the camera's two preview buffers
+        for grayscale frames already at label size.
+        """
+        key = (buf.__array_interface__["data"][0], width, height, bytes_per_line, fmt)
+        qimg = self._qimg_cache.get(key)
+        if qimg is None:
+            if len(self._qimg_cache) >= 4:
+                self._qimg_cache.clear()  # buffers were reallocated
+            qimg = QImage(buf.data, width, height, bytes_per_line, fmt)
+            self._qimg_cache[key] = qimg
+        return qimg
+
+    def changeEvent(self, event):
+        # Pause the frame grabber while minimized; the camera then skips
+        # the preview copy too, as nobody reads the frames
+        if event.type() == QEvent.Type.WindowStateChange and self.grabber is not None:
+            self.grabber.set_paused(self.isMinimized())
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        self._label_size = self.image_label.size()
+        super().resizeEvent(event)
 
     def closeEvent(self, event):
         """Ensure all hardware and timers are properly stopped."""
@@ -344,17 +536,22 @@ class MainWindow(QWidget):
         except Exception as e:
             print("Error stopping recording on close:", e)
         try:
-            if self.preview_running:
-                self.timer.stop()
+            self.record_start_timer.stop()
+            self._stop_grabber()
+            self.log_timer.stop()
         except Exception as e:
-            print("Error stopping timer on close:", e)
+            print("Error stopping frame grabber on close:", e)
         try:
             self.camera.stop()
         except Exception as e:
             print("Error stopping camera on close:", e)
+        # log_timer is stopped; print what the camera/recorder reported
+        # while shutting down
+        self.print_camera_log()
 
         # Then stop PulseManager (which also stops DAQ)
         try:
+            self.pulse_stats_timer.stop()
             if self.pulse_manager is not None:
                 self.pulse_manager.stop()
                 self.pulse_manager = None